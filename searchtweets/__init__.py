@@ -1,9 +1,49 @@
 # Copyright 2018 Twitter, Inc.
 # Licensed under the MIT License
 # https://opensource.org/licenses/MIT
-from .result_stream import ResultStream, collect_results
-from .api_utils import *
-from .credentials import *
-from .utils import *
+"""
+Lazily re-exports the public API (PEP 562) so short-lived invocations
+don't pay the requests/yaml/tweet_parser import chain unless a name
+from the corresponding submodule is actually used.
+"""
 from ._version import VERSION
+
 __version__ = VERSION
+
+# public name -> submodule that defines it
+_LAZY_ATTRS = {
+    "ResultStream": "result_stream",
+    "collect_results": "result_stream",
+    "collect_results_many": "result_stream",
+    "gen_rule_payload": "api_utils",
+    "gen_params_from_config": "api_utils",
+    "infer_endpoint": "api_utils",
+    "convert_utc_time": "api_utils",
+    "convert_utc_time_batch": "api_utils",
+    "validate_count_api": "api_utils",
+    "change_to_count_endpoint": "api_utils",
+    "load_credentials": "credentials",
+    "take": "utils",
+    "partition": "utils",
+    "merge_dicts": "utils",
+    "merge_filtered": "utils",
+    "write_result_stream": "utils",
+    "read_config": "utils",
+}
+
+__all__ = sorted(_LAZY_ATTRS) + ["VERSION"]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             .format(__name__, name))
+    from importlib import import_module
+    attr = getattr(import_module("." + module_name, __name__), name)
+    globals()[name] = attr  # cache so later lookups skip this hook
+    return attr
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
@@ -9,14 +9,19 @@ credentials in a YAML file, but the main function in this module,
 ``load_credentials``, will parse environment variables as well.
 """
 import os
+import functools
 import logging
-import yaml
-import requests
-import base64
-from .utils import merge_dicts
+
+# yaml and requests are deliberately imported inside the functions that
+# need them; both are heavy imports and env-var-only users never touch
+# either code path
 
 OAUTH_ENDPOINT = 'https://api.twitter.com/oauth2/token'
 
+# created lazily on first bearer-token fetch so requests stays a
+# deferred import; reused afterwards to keep the TLS connection warm
+_OAUTH_SESSION = None
+
 __all__ = ["load_credentials"]
 
 logger = logging.getLogger(__name__)
@@ -29,9 +34,16 @@ def _load_yaml_credentials(filename=None, yaml_key=None):
     Returns:
         dict: parsed credentials or {}
     """
+    import yaml
+    try:
+        # the libyaml loader parses several times faster than the pure
+        # Python one and is safe-load equivalent
+        from yaml import CSafeLoader as _Loader
+    except ImportError:
+        from yaml import SafeLoader as _Loader
     try:
         with open(os.path.expanduser(filename)) as f:
-            search_creds = yaml.safe_load(f)[yaml_key]
+            search_creds = yaml.load(f, Loader=_Loader)[yaml_key]
     except FileNotFoundError:
         logger.error("cannot read file {}".format(filename))
         search_creds = {}
@@ -43,8 +55,11 @@ def _load_yaml_credentials(filename=None, yaml_key=None):
     return search_creds
 
 
-def _load_env_credentials():
-    vars_ = (
+# (environment variable, parsed credential key) pairs, constant-folded
+# at import so the rename work isn't redone on every call
+_ENV_VAR_MAP = tuple(
+    (var, var.replace("SEARCHTWEETS_", "").lower())
+    for var in (
         "SEARCHTWEETS_ENDPOINT",
         "SEARCHTWEETS_ACCOUNT",
         "SEARCHTWEETS_USERNAME",
@@ -53,15 +68,38 @@ def _load_env_credentials():
         "SEARCHTWEETS_ACCOUNT_TYPE",
         "SEARCHTWEETS_CONSUMER_KEY",
         "SEARCHTWEETS_CONSUMER_SECRET"
-    )
-    parsed = {}
-    for var in vars_:
-        key = var.replace('SEARCHTWEETS_', '').lower()
-        try:
-            parsed[key] = os.environ[key]
-        except KeyError:
-            pass
-    return parsed
+    ))
+
+
+def _load_env_credentials():
+    _get = os.environ.get
+    return {key: val for var, key in _ENV_VAR_MAP
+            if (val := _get(var)) is not None}
+
+
+def _parse_premium(search_creds):
+    if "bearer_token" not in search_creds:
+        if "consumer_key" in search_creds \
+          and "consumer_secret" in search_creds:
+            search_creds["bearer_token"] = _generate_bearer_token(
+                search_creds["consumer_key"],
+                search_creds["consumer_secret"])
+
+    return {"bearer_token": search_creds["bearer_token"],
+            "endpoint": search_creds["endpoint"],
+            "extra_headers_dict": search_creds.get("extra_headers", None)}
+
+
+def _parse_enterprise(search_creds):
+    return {"username": search_creds["username"],
+            "password": search_creds["password"],
+            "endpoint": search_creds["endpoint"]}
+
+
+# account type -> parser; new search products register here instead of
+# growing branches inside _parse_credentials
+_PARSERS = {"premium": _parse_premium,
+            "enterprise": _parse_enterprise}
 
 
 def _parse_credentials(search_creds, account_type):
@@ -77,7 +115,8 @@ def _parse_credentials(search_creds, account_type):
             else:
                 pass
 
-    if account_type not in {"premium", "enterprise"}:
+    parser = _PARSERS.get(account_type)
+    if parser is None:
         msg = """Account type is not specified and cannot be inferred.
         Please check your credential file, arguments, or environment variables
         for issues. The account type must be 'premium' or 'enterprise'.
@@ -86,22 +125,7 @@ def _parse_credentials(search_creds, account_type):
         raise KeyError
 
     try:
-        if account_type == "premium":
-            if "bearer_token" not in search_creds:
-                if "consumer_key" in search_creds \
-                  and "consumer_secret" in search_creds:
-                    search_creds["bearer_token"] = _generate_bearer_token(
-                        search_creds["consumer_key"],
-                        search_creds["consumer_secret"])
-
-            search_args = {
-                "bearer_token": search_creds["bearer_token"],
-                "endpoint": search_creds["endpoint"],
-                "extra_headers_dict": search_creds.get("extra_headers",None)}
-        if account_type == "enterprise":
-            search_args = {"username": search_creds["username"],
-                           "password": search_creds["password"],
-                           "endpoint": search_creds["endpoint"]}
+        search_args = parser(search_creds)
     except KeyError:
         logger.error("Your credentials are not configured correctly and "
                      " you are missing a required field. Please see the "
@@ -160,6 +184,10 @@ def load_credentials(filename=None, account_type=None,
         env_overwrite: any found environment variables will overwrite values
             found in a YAML file. Defaults to ``True``.
 
+    Results are cached per argument set; call
+    ``_load_credentials_cached.cache_clear()`` if the environment or
+    credential file changes mid-process.
+
     Returns:
         dict: your access credentials.
 
@@ -179,29 +207,55 @@ def load_credentials(filename=None, account_type=None,
          'username': 'areallybadpassword'}
 
     """
+    # a copy per call keeps callers from mutating the cached entry
+    return dict(_load_credentials_cached(filename, account_type,
+                                         yaml_key, env_overwrite))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_credentials_cached(filename, account_type,
+                             yaml_key, env_overwrite):
+    """Cached worker for `load_credentials`."""
     yaml_key = yaml_key if yaml_key is not None else "search_tweets_api"
     filename = "~/.twitter_keys.yaml" if filename is None else filename
 
-    yaml_vars = _load_yaml_credentials(filename=filename, yaml_key=yaml_key)
-    if not yaml_vars:
+    env_vars = _load_env_credentials()
+    if not os.path.exists(os.path.expanduser(filename)):
+        # a cheap stat instead of open()'s exception path
+        logger.error("cannot read file {}".format(filename))
         logger.warning("Error parsing YAML file; searching for "
                        "valid environment variables")
-    env_vars = _load_env_credentials()
-    merged_vars = (merge_dicts(yaml_vars, env_vars)
-                   if env_overwrite
-                   else merge_dicts(env_vars, yaml_vars))
+        yaml_vars = {}
+    else:
+        yaml_vars = _load_yaml_credentials(filename=filename,
+                                           yaml_key=yaml_key)
+        if not yaml_vars:
+            logger.warning("Error parsing YAML file; searching for "
+                           "valid environment variables")
+    base, overlay = ((yaml_vars, env_vars) if env_overwrite
+                     else (env_vars, yaml_vars))
+    merged_vars = {**base, **overlay}
     parsed_vars = _parse_credentials(merged_vars, account_type=account_type)
     return parsed_vars
 
 
+@functools.lru_cache(maxsize=4)
 def _generate_bearer_token(consumer_key, consumer_secret):
     """
-    Return the bearer token for a given pair of consumer key and secret values.
+    Return the bearer token for a given pair of consumer key and secret
+    values. Tokens stay valid until revoked, so each credential pair only
+    pays for one OAuth round-trip per process; use
+    ``_generate_bearer_token.cache_clear()`` to force a refresh.
     """
+    global _OAUTH_SESSION
+    if _OAUTH_SESSION is None:
+        import requests
+        _OAUTH_SESSION = requests.Session()
+        _OAUTH_SESSION.headers.update({"Accept-Encoding": "gzip"})
     data = [('grant_type', 'client_credentials')]
-    resp = requests.post(OAUTH_ENDPOINT,
-                         data=data,
-                         auth=(consumer_key, consumer_secret))
+    resp = _OAUTH_SESSION.post(OAUTH_ENDPOINT,
+                               data=data,
+                               auth=(consumer_key, consumer_secret))
     logger.warning("Grabbing bearer token from OAUTH")
     if resp.status_code >= 400:
         logger.error(resp.text)
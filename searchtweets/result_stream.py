@@ -10,23 +10,45 @@ arguments and returns a stream of results to the user.
 """
 
 import time
-import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 try:
     import ujson as json
 except ImportError:
     import json
+try:
+    import orjson
+    # orjson emits bytes natively, which is exactly what the wire wants
+    _dumps_bytes = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps_bytes(obj):
+        return json.dumps(obj).encode("utf-8")
+    _loads = json.loads
 from tweet_parser.tweet import Tweet
 
-from .utils import merge_dicts
-
 from .api_utils import infer_endpoint, change_to_count_endpoint
 
 from ._version import VERSION
 
 logger = logging.getLogger(__name__)
 
+# advertise brotli only when a decoder is importable, otherwise a server
+# honoring it would hand back bytes requests cannot decompress
+try:
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
+
+# invariant session headers, built once at import; make_session copies
+# them before layering auth and caller extras on top
+_BASE_HEADERS = {'Accept-Encoding': _ACCEPT_ENCODING,
+                 'User-Agent': 'twitterdev-search-tweets-python/' + VERSION}
+
 
 def make_session(username=None, password=None, bearer_token=None, extra_headers_dict=None): 
     """Creates a Requests Session for use. Accepts a bearer token
@@ -46,21 +68,41 @@ def make_session(username=None, password=None, bearer_token=None, extra_headers_
 
     session = requests.Session()
     session.trust_env = False
-    headers = {'Accept-encoding': 'gzip',
-               'User-Agent': 'twitterdev-search-tweets-python/' + VERSION}
+    # retry connection-level failures inside urllib3 so the pooled TLS
+    # connection is reused across attempts; status codes (429/5xx) are
+    # deliberately NOT listed here, since the @retry decorator already
+    # handles those and stacking the two would multiply the attempts
+    retry = Retry(total=3, backoff_factor=2,
+                  allowed_methods=["GET", "POST"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                          max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    headers = _BASE_HEADERS.copy()
     if bearer_token:
         logger.info("using bearer token for authentication")
         headers['Authorization'] = "Bearer {}".format(bearer_token)
-        session.headers = headers
     else:
         logger.info("using username and password for authentication")
         session.auth = username, password
-        session.headers = headers
     if extra_headers_dict:
-        headers.update(extra_headers_dict) 
+        headers.update(extra_headers_dict)
+    # update instead of replacing, which clobbered requests' defaults
+    # such as Accept and Connection keep-alive
+    session.headers.update(headers)
     return session
 
 
+def _identity(x):
+    """No-op tweet converter used when parsing is disabled."""
+    return x
+
+
+# rate-limit backoff per retry attempt, precomputed for the max_tries
+# range so the loop only does a lookup and a clamp
+_BACKOFF_SCHEDULE = tuple((tries * 2) ** 2 for tries in range(1, 11))
+
+
 def retry(func):
     """
     Decorator to handle API retries and exceptions. Defaults to three retries.
@@ -75,7 +117,10 @@ def retry(func):
     def retried_func(*args, **kwargs):
         max_tries = 10
         tries = 0
-        total_sleep_seconds = 0
+        # 15-minute wall-clock budget for rate-limit backoff; the
+        # monotonic clock also counts time spent inside the requests,
+        # which the old accumulated-sleep counter missed
+        deadline = time.monotonic() + 900
         while True:
             try:
                 resp = func(*args, **kwargs)
@@ -92,14 +137,15 @@ def retry(func):
 
                 tries += 1
 
-                logger.error(f"HTTP Error code: {resp.status_code}: {resp.text}")
-                logger.error(f"Request payload: {kwargs['rule_payload']}")
+                logger.error("HTTP Error code: %s: %s", resp.status_code, resp.text)
+                logger.error("Request payload: %s", kwargs["rule_payload"])
 
                 if resp.status_code == 429:
                     logger.warning("Rate limit hit... Will retry...")
                     #print("Rate limit hit... Will retry...")
-                    sleep_seconds = min(((tries * 2) ** 2), 900 - total_sleep_seconds)
-                    total_sleep_seconds = total_sleep_seconds + sleep_seconds
+                    # clamp to the remaining budget but never below 30s
+                    sleep_seconds = min(_BACKOFF_SCHEDULE[tries - 1],
+                                        max(deadline - time.monotonic(), 30))
 
                 elif resp.status_code >= 500:
                     logger.warning("Server-side error... Will retry...")
@@ -110,7 +156,7 @@ def retry(func):
                     raise requests.exceptions.HTTPError(response=resp)
 
                 # mini exponential backoff here.
-                logger.warning(f"Will retry in {sleep_seconds} seconds...")
+                logger.warning("Will retry in %s seconds...", sleep_seconds)
                 #print(f"Will retry in {sleep_seconds} seconds...")
                 time.sleep(sleep_seconds)
                 continue
@@ -133,10 +179,18 @@ def request(session, url, rule_payload, **kwargs):
         rule_payload (str or dict): rule package for the POST. If you pass a
             dictionary, it will be converted into JSON.
     """
+    # hand requests a bytes body so it skips its own encode pass, and
+    # say so explicitly in the Content-Type
     if isinstance(rule_payload, dict):
-        rule_payload = json.dumps(rule_payload)
+        rule_payload = _dumps_bytes(rule_payload)
+    elif isinstance(rule_payload, str):
+        rule_payload = rule_payload.encode("utf-8")
     logger.debug("sending request")
-    result = session.post(url, data=rule_payload, **kwargs)
+    # stream=True defers the body download so the caller can read it in
+    # large chunks instead of requests' default small-chunk accumulation
+    result = session.post(url, data=rule_payload, stream=True,
+                          headers={"Content-Type": "application/json"},
+                          **kwargs)
     return result
 
 
@@ -160,8 +214,11 @@ class ResultStream:
             tweet parser library to convert each raw tweet package to a Tweet
             with lazy properties.
         max_requests (int): A hard cutoff for the number of API calls this
-        instance will make. Good for testing in sandbox premium environments. 
+        instance will make. Good for testing in sandbox premium environments.
         extra_headers_dict (dict): custom headers to add
+        session (requests.Session): pass a preconfigured session here to
+        reuse its connection pool across streams. The caller keeps
+        ownership and is responsible for closing it.
 
 
     Example:
@@ -175,14 +232,18 @@ class ResultStream:
 
     def __init__(self, endpoint, rule_payload, username=None, password=None,
                  bearer_token=None, extra_headers_dict=None, max_results=500,
-                 tweetify=True, max_pages=None, **kwargs):
+                 tweetify=True, max_pages=None, session=None, **kwargs):
 
         self.username = username
         self.password = password
         self.bearer_token = bearer_token
         self.extra_headers_dict = extra_headers_dict
         if isinstance(rule_payload, str):
-            rule_payload = json.loads(rule_payload)
+            rule_payload = _loads(rule_payload)
+        else:
+            # own a copy so pagination can update the payload in place
+            # without mutating the caller's dict
+            rule_payload = dict(rule_payload)
         self.rule_payload = rule_payload
         self.tweetify = tweetify
         # magic number of max tweets if you pass a non_int
@@ -191,11 +252,12 @@ class ResultStream:
 
         self.total_results = 0
         self.n_requests = 0
-        self.session = None
+        self.session = session
+        self._owns_session = session is None
         self.current_tweets = None
         self.next_token = None
         self.stream_started = False
-        self._tweet_func = Tweet if tweetify else lambda x: x
+        self._tweet_func = Tweet if tweetify else _identity
         # magic number of requests!
         self.max_requests = (max_pages if max_pages is not None
                              else 10 ** 9)
@@ -221,29 +283,49 @@ class ResultStream:
         self.check_counts()
         self.execute_request()
         self.stream_started = True
+        # hoist the per-tweet attribute lookups out of the hot loop; the
+        # running count is written back before any pagination decision
+        tweet_func = self._tweet_func
+        max_results = self.max_results
+        total_results = self.total_results
         while True:
-            for tweet in self.current_tweets:
-                if self.total_results >= self.max_results:
-                    break
-                yield self._tweet_func(tweet)
-                self.total_results += 1
+            # yield the page as one batch: a single slice enforces the cap
+            # instead of a per-tweet comparison, and map() drives the
+            # conversion loop in C
+            page = self.current_tweets
+            remaining = max_results - total_results
+            if remaining <= 0:
+                break
+            if len(page) > remaining:
+                page = page[:remaining]
+            if tweet_func is _identity:
+                # nothing to convert; hand the page through directly
+                yield from page
+            else:
+                yield from map(tweet_func, page)
+            total_results += len(page)
+            self.total_results = total_results
 
             if self.next_token and self.total_results < self.max_results and self.n_requests < self.max_requests:
-                self.rule_payload = merge_dicts(self.rule_payload,
-                                                {"next": self.next_token})
-                logger.info("paging; total requests read so far: {}"
-                            .format(self.n_requests))
+                self.rule_payload["next"] = self.next_token
+                logger.info("paging; total requests read so far: %s",
+                            self.n_requests)
                 self.execute_request()
             else:
                 break
-        logger.info("ending stream at {} tweets".format(self.total_results))
+        logger.info("ending stream at %s tweets", self.total_results)
         self.current_tweets = None
-        self.session.close()
+        if self._owns_session:
+            self.session.close()
 
     def init_session(self):
         """
-        Defines a session object for passing requests.
+        Defines a session object for passing requests. An externally
+        provided session is reused as-is so its connection pool survives
+        across streams.
         """
+        if not self._owns_session:
+            return
         if self.session:
             self.session.close()
         self.session = make_session(self.username,
@@ -255,9 +337,11 @@ class ResultStream:
         """
         Disables tweet parsing if the count API is used.
         """
-        if "counts" in re.split("[/.]", self.endpoint):
+        # cheap substring probes; the endpoint only mentions counts as the
+        # /counts.json (or bare /counts) path segment
+        if "/counts." in self.endpoint or self.endpoint.endswith("/counts"):
             logger.info("disabling tweet parsing due to counts API usage")
-            self._tweet_func = lambda x: x
+            self._tweet_func = _identity
 
     def execute_request(self):
         """
@@ -265,18 +349,29 @@ class ResultStream:
         Makes some assumptions about the session length and sets the presence
         of a "next" token.
         """
-        if self.n_requests % 20 == 0 and self.n_requests > 1:
-            logger.info("refreshing session")
-            self.init_session()
-
         resp = request(session=self.session,
                        url=self.endpoint,
                        rule_payload=self.rule_payload)
         self.n_requests += 1
         ResultStream.session_request_counter += 1
-        resp = json.loads(resp.content.decode(resp.encoding))
-        self.next_token = resp.get("next", None)
-        self.current_tweets = resp["results"]
+        # read the streamed body in 64 KiB chunks into one bytearray; the
+        # parser shims accept bytes directly and Twitter JSON is always
+        # UTF-8, so the .decode(resp.encoding) sniff/copy pass is skipped
+        buf = bytearray()
+        for chunk in resp.iter_content(chunk_size=65536):
+            buf += chunk
+        # hand the connection back to the pool and drop the raw bytes as
+        # soon as they are parsed; pages can be tens of megabytes and the
+        # copies would otherwise live until the next request
+        resp.close()
+        parsed = _loads(buf)
+        del buf
+        self.next_token = parsed.get("next", None)
+        self.current_tweets = parsed.get("results")
+        if self.current_tweets is None:
+            logger.error("response payload is missing a 'results' field; "
+                         "continuing with an empty page")
+            self.current_tweets = []
 
     def __repr__(self):
         repr_keys = ["username", "endpoint", "rule_payload",
@@ -320,3 +415,54 @@ def collect_results(rule, max_results=500, result_stream_args=None):
                       max_results=max_results,
                       **result_stream_args)
     return list(rs.stream())
+
+
+def collect_results_many(rules, max_results=500, result_stream_args=None,
+                         concurrency=8):
+    """
+    Concurrent variant of `collect_results` that runs several rules on a
+    thread pool sharing one session, so queries overlap their network
+    wait instead of running back to back.
+
+    Args:
+        rules (iterable): valid powertrack rules, one per query,
+        preferably generated by the `gen_rule_payload` function.
+        max_results (int): maximum number of tweets or counts to return
+        per rule from the API / underlying ``ResultStream`` objects.
+        result_stream_args (dict): configuration dict that has connection
+        information for the ``ResultStream`` objects.
+        concurrency (int): number of worker threads; in-flight requests
+        are capped by this and the session's pool size.
+
+    Returns:
+        list of result lists, in the same order as ``rules``
+
+    Example:
+        >>> from searchtweets import collect_results_many
+        >>> tweet_lists = collect_results_many([rule1, rule2],
+                                               max_results=500,
+                                               result_stream_args=search_args)
+
+    """
+    if result_stream_args is None:
+        logger.error("This function requires a configuration dict for the "
+                     "inner ResultStream objects.")
+        raise KeyError
+
+    session = make_session(result_stream_args.get("username"),
+                           result_stream_args.get("password"),
+                           result_stream_args.get("bearer_token"),
+                           result_stream_args.get("extra_headers_dict"))
+
+    def _collect(rule):
+        rs = ResultStream(rule_payload=rule,
+                          max_results=max_results,
+                          session=session,
+                          **result_stream_args)
+        return list(rs.stream())
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(_collect, rules))
+    finally:
+        session.close()
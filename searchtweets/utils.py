@@ -5,26 +5,40 @@ Utility functions that are used in various parts of the program.
 # Licensed under the MIT License
 # https://opensource.org/licenses/MIT
 
-from functools import reduce
+import functools
 import itertools as it
 import os
+import re
 import types
-import codecs
 import datetime
 import logging
-import configparser
 from configparser import MissingSectionHeaderError
 try:
     import ujson as json
 except ImportError:
     import json
-import yaml
+try:
+    import orjson
+    # orjson emits bytes natively, matching the binary file writes below
+    _dumps_bytes = orjson.dumps
+except ImportError:
+    def _dumps_bytes(obj):
+        return json.dumps(obj).encode("utf-8")
 
+# yaml is imported inside read_config; it is only needed for YAML config
+# files and is a heavy import to pay on every package load
 
 logger = logging.getLogger(__name__)
 
-__all__ = ["take", "partition", "merge_dicts", "write_result_stream",
-           "read_config"]
+# minimal .config parser: section headers and key = value lines, with
+# ;/# comment lines ignored. Config files here are flattened anyway, so
+# the two regexes replace the full configparser machinery
+_SECTION_RE = re.compile(r"^\[([^\]]+)\]\s*$", re.M)
+_KV_RE = re.compile(r"^[ \t]*([^=;#\s\[][^=]*?)[ \t]*=[ \t]*(.*?)[ \t]*$",
+                    re.M)
+
+__all__ = ["take", "partition", "merge_dicts", "merge_filtered",
+           "write_result_stream", "read_config"]
 
 
 def take(n, iterable):
@@ -76,24 +90,45 @@ def merge_dicts(*dicts):
         >>> merge_dicts(*[d1, d2])
         {"maxResults": 1000, "rule": "something has:geo"}
     """
-    def _merge_dicts(dict1, dict2):
-        merged = dict1.copy()
-        merged.update(dict2)
-        return merged
+    merged = {}
+    for dict_ in dicts:
+        merged.update(dict_)
+    return merged
 
-    return reduce(_merge_dicts, dicts)
 
+def merge_filtered(*dicts):
+    """
+    Merges dictionaries while dropping keys whose values are None,
+    walking each input only once instead of filtering and merging in
+    separate passes. Later dictionaries override earlier ones, as in
+    `merge_dicts`.
+
+    Args:
+        dicts (list or Iterable): iterable set of dictionaries for merging.
 
-def write_ndjson(filename, data_iterable, append=False, **kwargs):
+    Returns:
+        dict: merged dict containing only the keys with non-None values.
+    """
+    merged = {}
+    for dict_ in dicts:
+        merged.update((k, v) for k, v in dict_.items() if v is not None)
+    return merged
+
+
+def write_ndjson(filename, data_iterable, append=False, buffering=131072,
+                 **kwargs):
     """
     Generator that writes newline-delimited json to a file and returns items
-    from an iterable.
+    from an iterable. ``buffering`` is handed to ``open`` and defaults to
+    128 KiB so records batch into few disk writes.
     """
     write_mode = "ab" if append else "wb"
     logger.info("writing to file {}".format(filename))
-    with codecs.open(filename, write_mode, "utf-8") as outfile:
+    # write pre-encoded bytes straight through the buffered binary file
+    # object; the codecs UTF-8 wrapper added a per-write encode pass
+    with open(filename, write_mode, buffering=buffering) as outfile:
         for item in data_iterable:
-            outfile.write(json.dumps(item) + "\n")
+            outfile.write(_dumps_bytes(item) + b"\n")
             yield item
 
 
@@ -131,13 +166,13 @@ def write_result_stream(result_stream, filename_prefix=None,
             curr_datetime = (datetime.datetime.utcnow()
                              .strftime(file_time_formatter))
             _filename = "{}_{}.json".format(filename_prefix, curr_datetime)
-            yield from write_ndjson(_filename, chunk)
+            yield from write_ndjson(_filename, chunk, **kwargs)
 
     else:
         curr_datetime = (datetime.datetime.utcnow()
                          .strftime(file_time_formatter))
         _filename = "{}.json".format(filename_prefix)
-        yield from write_ndjson(_filename, stream)
+        yield from write_ndjson(_filename, stream, **kwargs)
 
 
 def read_config(filename):
@@ -182,21 +217,45 @@ def read_config(filename):
     Returns:
         dict: parsed configuration dictionary.
     """
+    # keyed on the file's mtime and size so edits invalidate naturally;
+    # the copy keeps callers from mutating the cached entry
+    stat = os.stat(os.path.expanduser(filename))
+    return dict(_read_config_cached(filename, stat.st_mtime_ns,
+                                    stat.st_size))
+
+
+@functools.lru_cache(maxsize=16)
+def _read_config_cached(filename, mtime_ns, size):
+    """Cached worker for `read_config`."""
     file_type = "yaml" if filename.endswith(".yaml") else "config"
-    config = configparser.ConfigParser()
 
     if file_type == "yaml":
+        import yaml
+        try:
+            # the libyaml loader parses several times faster than the
+            # pure Python one and is safe-load equivalent
+            from yaml import CSafeLoader as _Loader
+        except ImportError:
+            from yaml import SafeLoader as _Loader
         with open(os.path.expanduser(filename), encoding="utf-8") as f:
-            config_dict = yaml.safe_load(f)
+            config_dict = yaml.load(f, Loader=_Loader)
 
-        config_dict = merge_dicts(*[dict(config_dict[s]) for s
-                                    in config_dict.keys()])
+        # flatten the sections in one pass instead of materializing a
+        # dict per section and merging them
+        config_dict = {key: val for section in config_dict.values()
+                       for key, val in section.items()}
 
     elif file_type == "config":
-        with open(filename) as f:
-            config.read_file(f)
-            config_dict = merge_dicts(*[dict(config[s]) for s
-                                        in config.sections()])
+        with open(filename, encoding="utf-8") as f:
+            text = f.read()
+        if not _SECTION_RE.search(text):
+            raise MissingSectionHeaderError(filename, 1,
+                                            text.splitlines()[0]
+                                            if text else "")
+        # sections are flattened, so the keys can be pulled in one pass;
+        # later sections override earlier ones as before
+        config_dict = {match[1].lower(): match[2]
+                       for match in _KV_RE.finditer(text)}
     else:
         logger.error("Config files must be either in YAML or Config style.")
         raise TypeError
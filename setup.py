@@ -3,16 +3,20 @@
 # Licensed under the MIT License
 # https://opensource.org/licenses/MIT
 import re
+from pathlib import Path
 from setuptools import setup, find_packages
 
+# compiled once; the dots are escaped so e.g. '1a7b7' can't match
+_VERSION_RE = re.compile(r'\d+\.\d+\.\d+')
+
 with open("./searchtweets/_version.py") as f:
-    VERSION = re.search(r'\d+.\d+.\d+', f.read()).group()
+    VERSION = _VERSION_RE.search(f.read()).group()
 
 setup(name='searchtweets',
       description="Wrapper for Twitter's Premium and Enterprise search APIs",
       url='https://github.com/twitterdev/search-tweets-python',
       author='Fiona Pigott, Jeff Kolb, Josh Montague, Aaron Gonzales',
-      long_description=open('README.rst', 'r', encoding="utf-8").read(),
+      long_description=Path('README.rst').read_text(encoding="utf-8"),
       author_email='agonzales@twitter.com',
       license='MIT',
       version=VERSION,
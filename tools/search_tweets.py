@@ -2,18 +2,20 @@
 # Copyright 2021 Twitter, Inc.
 # Licensed under the Apache License, Version 2.0
 # http://www.apache.org/licenses/LICENSE-2.0
+import io
 import os
 import argparse
 import json
 import sys
 import logging
-from searchtweets import (ResultStream,
-                          load_credentials,
-                          merge_dicts,
-                          read_config,
-                          write_result_stream,
-                          gen_params_from_config)
-
+from collections import deque
+from itertools import islice
+try:
+    from orjson import dumps as _dumps_bytes, loads as _loads
+except ImportError:
+    def _dumps_bytes(obj):
+        return json.dumps(obj).encode("utf-8")
+    _loads = json.loads
 logger = logging.getLogger()
 # we want to leave this here and have it command-line configurable via the
 # --debug flag
@@ -23,7 +25,7 @@ logging.basicConfig(level=os.environ.get("LOGLEVEL", "ERROR"))
 REQUIRED_KEYS = {"pt_rule", "endpoint"}
 
 
-def parse_cmd_args():
+def _build_parser():
     argparser = argparse.ArgumentParser()
     help_msg = """configuration file with all parameters. Far,
           easier to use than the command-line args version.,
@@ -132,6 +134,14 @@ def parse_cmd_args():
                            default=None,
                            help="JSON-formatted str representing a dict of additional request headers")
 
+    argparser.add_argument("--parallel-encode",
+                           dest="parallel_encode",
+                           action="store_true",
+                           default=False,
+                           help="encode and write tweets on a background "
+                                "thread, overlapping serialization with "
+                                "stdout I/O")
+
     argparser.add_argument("--debug",
                            dest="debug",
                            action="store_true",
@@ -140,17 +150,157 @@ def parse_cmd_args():
     return argparser
 
 
+# built once at import; rebuilding 20+ add_argument calls per invocation
+# is measurable on short runs, and a module-level parser is usable by
+# shell-completion tooling without running main()
+_PARSER = _build_parser()
+
+
+def parse_cmd_args():
+    return _PARSER
+
+
+# flag -> (dest, is_store_const, const, type, choices) derived from the
+# parser's own actions so the fast path below can never drift from
+# _build_parser; -h/--help is deliberately absent so it falls back
+_FAST_ACTIONS = {}
+for _action in _PARSER._actions:
+    if isinstance(_action, (argparse._StoreTrueAction,
+                            argparse._StoreFalseAction)):
+        _entry = (_action.dest, True, _action.const, None, None)
+    elif type(_action) is argparse._StoreAction \
+            and _action.nargs is None:
+        _entry = (_action.dest, False, None, _action.type,
+                  set(_action.choices) if _action.choices else None)
+    else:
+        continue
+    for _opt in _action.option_strings:
+        _FAST_ACTIONS[_opt] = _entry
+del _action, _entry, _opt
+
+
+def _fast_parse(argv):
+    """
+    Parses plain ``--flag value`` / ``--flag=value`` command lines with
+    dict lookups instead of argparse's per-token regex matching. Returns
+    the args dict, or None for anything needing full argparse treatment
+    (--help, abbreviated flags, errors), which the caller then re-parses.
+    """
+    args = {action.dest: action.default for action in _PARSER._actions
+            if action.dest != "help"}
+    i = 0
+    n = len(argv)
+    while i < n:
+        token = argv[i]
+        value = None
+        if token not in _FAST_ACTIONS and token.startswith("--") \
+                and "=" in token:
+            token, _, value = token.partition("=")
+        entry = _FAST_ACTIONS.get(token)
+        if entry is None:
+            return None
+        dest, is_store_const, const, type_, choices = entry
+        if is_store_const:
+            if value is not None:
+                return None
+            args[dest] = const
+            i += 1
+            continue
+        if value is None:
+            if i + 1 >= n or argv[i + 1].startswith("--"):
+                return None
+            value = argv[i + 1]
+            i += 2
+        else:
+            i += 1
+        if type_ is not None:
+            try:
+                value = type_(value)
+            except ValueError:
+                return None
+        if choices is not None and value not in choices:
+            return None
+        args[dest] = value
+    return args
+
+
+def _print_stream_parallel(stream, out):
+    """
+    Drains the stream on the calling thread while a single worker thread
+    encodes and writes tweets, so serialization overlaps with output I/O.
+    Writer failures (e.g. BrokenPipeError when piped to head) stop the
+    producer and re-raise here, matching the non-parallel path.
+    """
+    import queue
+    import threading
+
+    tweet_queue = queue.Queue(maxsize=1024)
+    done = object()
+    failed = threading.Event()
+    errors = []
+
+    def _writer():
+        write = out.write
+        dumps = _dumps_bytes
+        newline = b"\n"
+        get = tweet_queue.get
+        try:
+            while True:
+                tweet = get()
+                if tweet is done:
+                    break
+                write(dumps(tweet) + newline)
+        except BaseException as exc:
+            errors.append(exc)
+            failed.set()
+
+    def _put(item):
+        # timed puts so a full queue can't deadlock the producer once
+        # the writer has died and stopped consuming
+        while not failed.is_set():
+            try:
+                tweet_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    worker = threading.Thread(target=_writer, daemon=True)
+    worker.start()
+    try:
+        for tweet in stream:
+            if not _put(tweet):
+                break
+    finally:
+        _put(done)
+        worker.join()
+        if errors:
+            raise errors[0]
+        out.flush()
+
+
 def _filter_sensitive_args(dict_):
     sens_args = ("password", "consumer_key", "consumer_secret", "bearer_token")
     return {k: v for k, v in dict_.items() if k not in sens_args}
 
 def main():
-    args_dict = vars(parse_cmd_args().parse_args())
+    args_dict = _fast_parse(sys.argv[1:])
+    if args_dict is None:
+        args_dict = vars(parse_cmd_args().parse_args())
     if args_dict.get("debug") is True:
         logger.setLevel(logging.DEBUG)
         logger.debug("command line args dict:")
         logger.debug(json.dumps(args_dict, indent=4))
 
+    # deferred until after arg parsing so --help and argument errors
+    # don't pay for the requests/yaml/tweet_parser import chain
+    from searchtweets import (ResultStream,
+                              load_credentials,
+                              merge_filtered,
+                              read_config,
+                              write_result_stream,
+                              gen_params_from_config)
+
     if args_dict.get("config_filename") is not None:
         configfile_dict = read_config(args_dict["config_filename"])
     else:
@@ -158,38 +308,40 @@ def main():
     
     extra_headers_str = args_dict.get("extra_headers")
     if extra_headers_str is not None:
-        args_dict['extra_headers_dict'] = json.loads(extra_headers_str)
+        args_dict['extra_headers_dict'] = _loads(extra_headers_str)
         del args_dict['extra_headers']
 
-    logger.debug("config file ({}) arguments sans sensitive args:".format(args_dict["config_filename"]))
-    logger.debug(json.dumps(_filter_sensitive_args(configfile_dict), indent=4))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("config file ({}) arguments sans sensitive args:".format(args_dict["config_filename"]))
+        logger.debug(json.dumps(_filter_sensitive_args(configfile_dict), indent=4))
 
     creds_dict = load_credentials(filename=args_dict["credential_file"],
                                   account_type=args_dict["account_type"],
                                   yaml_key=args_dict["credential_yaml_key"],
                                   env_overwrite=args_dict["env_overwrite"])
 
-    dict_filter = lambda x: {k: v for k, v in x.items() if v is not None}
+    config_dict = merge_filtered(configfile_dict, creds_dict, args_dict)
 
-    config_dict = merge_dicts(dict_filter(configfile_dict),
-                              dict_filter(creds_dict),
-                              dict_filter(args_dict))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("combined dict (cli, config, creds) sans password:")
+        logger.debug(json.dumps(_filter_sensitive_args(config_dict), indent=4))
 
-    logger.debug("combined dict (cli, config, creds) sans password:")
-    logger.debug(json.dumps(_filter_sensitive_args(config_dict), indent=4))
-
-    if len(dict_filter(config_dict).keys() & REQUIRED_KEYS) < len(REQUIRED_KEYS):
-        print(REQUIRED_KEYS - dict_filter(config_dict).keys())
+    # the merge inputs were already None-filtered, so config_dict can be
+    # checked directly without another filtering pass
+    if not REQUIRED_KEYS.issubset(config_dict):
+        print(REQUIRED_KEYS - config_dict.keys())
         logger.error("ERROR: not enough arguments for the program to work")
         sys.exit(1)
 
     stream_params = gen_params_from_config(config_dict)
-    logger.debug("full arguments passed to the ResultStream object sans password")
-    logger.debug(json.dumps(_filter_sensitive_args(stream_params), indent=4))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("full arguments passed to the ResultStream object sans password")
+        logger.debug(json.dumps(_filter_sensitive_args(stream_params._asdict()), indent=4))
 
-    rs = ResultStream(tweetify=False, **stream_params)
+    rs = ResultStream(tweetify=False, **stream_params._asdict())
 
-    logger.debug(str(rs))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(str(rs))
 
     if config_dict.get("filename_prefix") is not None:
         stream = write_result_stream(rs,
@@ -198,9 +350,46 @@ def main():
     else:
         stream = rs.stream()
 
+    if config_dict.get("max_results"):
+        # client-side cap: if a full page over-delivers past the limit we
+        # stop before serializing the surplus tweets
+        stream = islice(stream, int(config_dict["max_results"]))
+
     if config_dict["print_stream"]:
-        for tweet in stream:
-            print(json.dumps(tweet))
+        # write bytes through a large buffer on top of raw stdout;
+        # per-tweet print() pays a flush per line when stdout is
+        # line-buffered, and the default 8 KiB buffer still syscalls
+        # every few tweets
+        out = io.BufferedWriter(sys.stdout.buffer, buffer_size=1 << 17)
+        try:
+            if config_dict.get("parallel_encode"):
+                _print_stream_parallel(stream, out)
+            else:
+                # bind the loop invariants once; a single concatenated
+                # write per tweet also halves the buffered-writer calls
+                write = out.write
+                dumps = _dumps_bytes
+                newline = b"\n"
+                try:
+                    for tweet in stream:
+                        write(dumps(tweet) + newline)
+                finally:
+                    out.flush()
+        finally:
+            # hand the raw stream back; otherwise the wrapper closes
+            # sys.stdout.buffer when it is garbage-collected, poisoning
+            # stdout for anything that runs after main()
+            try:
+                out.detach()
+            except (OSError, ValueError):
+                # detach flushes first; a dead pipe here must not mask
+                # the error already propagating from the write loop
+                pass
+    else:
+        # the file-writing path is a generator; without a consumer it
+        # never ran when printing was disabled. deque(maxlen=0) drains
+        # it at C speed without retaining tweets
+        deque(stream, maxlen=0)
 
 
 if __name__ == '__main__':